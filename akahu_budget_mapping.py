@@ -35,7 +35,7 @@ from modules.account_mapper import (
     check_for_changes,
     remove_seq
 )
-from modules.config import RUN_SYNC_TO_YNAB, RUN_SYNC_TO_AB
+from modules.config import run_sync_to_ynab, run_sync_to_ab, validate_required
 
 
 # Load environment variables from the parent directory's .env file
@@ -45,7 +45,7 @@ load_dotenv(dotenv_path=pathlib.Path(__file__).parent / '.env')
 DEBUG = False
 
 # Define required environment variables based on sync settings
-logging.info(f"Sync targets - YNAB: {RUN_SYNC_TO_YNAB}, AB: {RUN_SYNC_TO_AB}")
+logging.info(f"Sync targets - YNAB: {run_sync_to_ynab()}, AB: {run_sync_to_ab()}")
 
 required_envs = [
     'AKAHU_USER_TOKEN',
@@ -54,14 +54,14 @@ required_envs = [
     'OPENAI_API_KEY',
 ]
 
-if RUN_SYNC_TO_AB:
+if run_sync_to_ab():
     required_envs.extend([
         'ACTUAL_SERVER_URL',
         'ACTUAL_PASSWORD',
         'ACTUAL_SYNC_ID',
     ])
 
-if RUN_SYNC_TO_YNAB:
+if run_sync_to_ynab():
     required_envs.extend([
         'YNAB_BEARER_TOKEN',
         'YNAB_BUDGET_ID',
@@ -82,11 +82,12 @@ for key, value in ENVs.items():
 
 def main():
     logging.info("Starting Akahu API integration script.")
+    validate_required()
 
     latest_actual_accounts = {}
     latest_ynab_accounts = {}
 
-    if RUN_SYNC_TO_AB:
+    if run_sync_to_ab():
         try:
             # Removed the encryption_password parameter
             with Actual(
@@ -105,7 +106,7 @@ def main():
         logging.info("Not syncing to Actual Budget")
 
     latest_ynab_accounts = {}
-    if RUN_SYNC_TO_YNAB:
+    if run_sync_to_ynab():
         latest_ynab_accounts = fetch_ynab_accounts()
         logging.info(f"Fetched {len(latest_ynab_accounts)} YNAB accounts.")
     else:
@@ -116,11 +117,14 @@ def main():
 
     # Retrofit budget IDs to existing mappings to avoid having to manually remap accounts
     # This is a one-time update for existing mappings that don't have these fields
+    retrofitted = False
     for mapping in existing_mapping.values():
         if 'ynab_account_id' in mapping and 'ynab_budget_id' not in mapping:
             mapping['ynab_budget_id'] = os.getenv('YNAB_BUDGET_ID')
+            retrofitted = True
         if 'actual_account_id' in mapping and 'actual_budget_id' not in mapping:
             mapping['actual_budget_id'] = os.getenv('ACTUAL_SYNC_ID')
+            retrofitted = True
 
     # Step 1: Fetch Akahu accounts
     latest_akahu_accounts = fetch_akahu_accounts()
@@ -136,14 +140,8 @@ def main():
         existing_ynab_accounts
     )
 
-    akahu_accounts = dict(sorted(
-        akahu_accounts.items(),
-        key=lambda x: x[1]['name'].lower()
-    ))
-
-    new_mapping = existing_mapping.copy()
-
-    # Compare accounts for changes
+    # Compare accounts for changes. This must run after merge_and_update_mapping,
+    # which copies date_first_loaded onto the latest accounts.
     (akahu_accounts_match, actual_accounts_match, ynab_accounts_match) = check_for_changes(
         existing_akahu_accounts, 
         latest_akahu_accounts, 
@@ -152,17 +150,30 @@ def main():
         existing_ynab_accounts, 
         latest_ynab_accounts
     )
+    accounts_unchanged = akahu_accounts_match and actual_accounts_match and ynab_accounts_match
+
+    # Nothing to match or save, so skip the sort, copy and rewrite of the mapping file
+    if accounts_unchanged and not retrofitted:
+        logging.info("No changes detected in Akahu, Actual, or YNAB accounts. Mapping is up to date.")
+        return
+
+    akahu_accounts = dict(sorted(
+        akahu_accounts.items(),
+        key=lambda x: x[1]['name'].lower()
+    ))
+
+    new_mapping = existing_mapping.copy()
 
     # Only proceed with matching if changes are detected
-    if akahu_accounts_match and actual_accounts_match and ynab_accounts_match:
+    if accounts_unchanged:
         logging.info("No changes detected in Akahu, Actual, or YNAB accounts. Skipping match")
     else:
         # Step 6: Match Akahu accounts to YNAB accounts interactively
-        if RUN_SYNC_TO_YNAB:
+        if run_sync_to_ynab():
             new_mapping = match_accounts(new_mapping, akahu_accounts, ynab_accounts, "ynab", use_openai=True)
 
         # Step 5: Match Akahu accounts to Actual accounts interactively
-        if RUN_SYNC_TO_AB:
+        if run_sync_to_ab():
             new_mapping = match_accounts(new_mapping, akahu_accounts, actual_accounts, "actual", use_openai=True)
 
     # Step 7: Save the final mapping
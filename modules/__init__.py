@@ -17,7 +17,6 @@ from .account_mapper import (
 )
 
 from .transaction_handler import (
-    get_all_akahu,
     load_transactions_into_actual,
     load_transactions_into_ynab,
     handle_tracking_account_actual,
@@ -25,6 +24,8 @@ from .transaction_handler import (
     create_adjustment_txn_ynab,
 )
 
+from .akahu_async import fetch_all_akahu
+
 from .sync_handler import sync_to_ab, sync_to_ynab
 
 from .webhook_handler import verify_signature, create_flask_app
@@ -44,12 +45,13 @@ __all__ = [
     "check_for_changes",
     "remove_seq",
     # Transaction Handler
-    "get_all_akahu",
     "load_transactions_into_actual",
     "load_transactions_into_ynab",
     "handle_tracking_account_actual",
     "clean_txn_for_ynab",
     "create_adjustment_txn_ynab",
+    # Akahu Async
+    "fetch_all_akahu",
     # Sync Handler
     "sync_to_ab",
     "sync_to_ynab",
@@ -2,9 +2,8 @@
 
 import os
 import logging
-import requests
 from actual.queries import get_accounts, get_account
-from modules.config import AKAHU_ENDPOINT, AKAHU_HEADERS, YNAB_ENDPOINT, YNAB_HEADERS
+from modules.config import AKAHU_ENDPOINT, AKAHU_SESSION, YNAB_ENDPOINT, YNAB_SESSION
 
 
 def is_simple_value(value):
@@ -16,7 +15,7 @@ def fetch_akahu_accounts():
     """Fetch accounts from Akahu API"""
 
     logging.info("Fetching Akahu accounts...")
-    response = requests.get(f"{AKAHU_ENDPOINT}/accounts", headers=AKAHU_HEADERS)
+    response = AKAHU_SESSION.get(f"{AKAHU_ENDPOINT}/accounts")
     if response.status_code != 200:
         logging.error(
             f"Failed to fetch Akahu accounts: {response.status_code} {response.text}"
@@ -82,7 +81,7 @@ def fetch_ynab_accounts():
         if not ynab_budget_id:
             raise ValueError("YNAB_BUDGET_ID environment variable is not set.")
 
-        accounts_json = requests.get(
+        accounts_json = YNAB_SESSION.get(
             f"{ynab_endpoint}budgets/{ynab_budget_id}/accounts", headers=ynab_headers
         ).json()
 
@@ -106,7 +105,7 @@ def fetch_ynab_accounts():
 def get_akahu_balance(akahu_account_id, akahu_endpoint, akahu_headers):
     """Fetch the balance for an Akahu account."""
     try:
-        response = requests.get(
+        response = AKAHU_SESSION.get(
             f"{akahu_endpoint}/accounts/{akahu_account_id}", headers=akahu_headers
         )
         if response.status_code != 200:
@@ -146,7 +145,7 @@ def get_actual_balance(actual, actual_account_id):
 
 def get_ynab_balance(ynab_budget_id, ynab_account_id):
     uri = f"{YNAB_ENDPOINT}budgets/{ynab_budget_id}/accounts/{ynab_account_id}"
-    response = requests.get(uri, headers=YNAB_HEADERS)
+    response = YNAB_SESSION.get(uri)
     response.raise_for_status()
     account_info = response.json()
     return account_info["data"]["account"]["balance"]
@@ -1,13 +1,17 @@
 # Module for handling account mapping logic
-import json
 import logging
 from datetime import datetime
 import openai
+import orjson
 import os
-from fuzzywuzzy import process
+import re
+from rapidfuzz import fuzz, process, utils
 
 # OpenAI client will be initialized in functions that need it
 
+# Raw mapping file bytes keyed by absolute path, each stored as (st_mtime_ns, raw)
+_MAPPING_CACHE = {}
+
 
 def is_simple_value(value):
     """Check if the value is a trivial type: int, float, str, bool, or None"""
@@ -29,48 +33,63 @@ def generate_mapping_stub(mapping_file="akahu_budget_mapping.json"):
         "ynab_accounts": {},
         "mapping": {},
     }
-    with open(mapping_file, "w") as f:
-        json.dump(stub, f, indent=4)
+    with open(mapping_file, "wb") as f:
+        f.write(orjson.dumps(stub, option=orjson.OPT_INDENT_2))
     print(f"Stub mapping file created: {mapping_file}")
 
 
 def load_existing_mapping(
     mapping_file="akahu_budget_mapping.json", generate_stub=False
 ):
-    """Load existing mapping from JSON file"""
-    try:
-        with open(mapping_file, "r") as f:
-            data = json.load(f)
-            # Validate required fields
-            required_fields = [
-                "akahu_accounts",
-                "actual_accounts",
-                "ynab_accounts",
-                "mapping",
-            ]
-            if not all(field in data for field in required_fields):
-                raise ValueError(
-                    f"Mapping file missing required fields: {required_fields}"
-                )
+    """Load existing mapping from JSON file.
 
-            mapping = data.get("mapping", {})
-            if isinstance(mapping, list):
-                mapping = {
-                    entry["akahu_id"]: entry for entry in mapping if "akahu_id" in entry
-                }
-            return (
-                data["akahu_accounts"],
-                data["actual_accounts"],
-                data["ynab_accounts"],
-                mapping,
-            )
+    The raw file bytes are cached per file and reused until the file's mtime
+    changes. Each call parses a fresh copy, so callers can mutate the result.
+    """
+    cache_key = os.path.abspath(mapping_file)
+    try:
+        mtime_ns = os.stat(mapping_file).st_mtime_ns
+        cached = _MAPPING_CACHE.get(cache_key)
+        if cached is not None and cached[0] == mtime_ns:
+            raw = cached[1]
+        else:
+            with open(mapping_file, "rb") as f:
+                raw = f.read()
+            _MAPPING_CACHE[cache_key] = (mtime_ns, raw)
     except FileNotFoundError:
         logging.warning("Mapping file not found - first run ever?")
         generate_mapping_stub(mapping_file=mapping_file)
         return load_existing_mapping(mapping_file=mapping_file, generate_stub=False)
-    except json.JSONDecodeError:
+
+    try:
+        data = orjson.loads(raw)
+    except orjson.JSONDecodeError:
         raise ValueError(f"Invalid JSON in mapping file {mapping_file}")
 
+    # Validate required fields
+    required_fields = [
+        "akahu_accounts",
+        "actual_accounts",
+        "ynab_accounts",
+        "mapping",
+    ]
+    if not all(field in data for field in required_fields):
+        raise ValueError(
+            f"Mapping file missing required fields: {required_fields}"
+        )
+
+    mapping = data.get("mapping", {})
+    if isinstance(mapping, list):
+        mapping = {
+            entry["akahu_id"]: entry for entry in mapping if "akahu_id" in entry
+        }
+    return (
+        data["akahu_accounts"],
+        data["actual_accounts"],
+        data["ynab_accounts"],
+        mapping,
+    )
+
 
 def combine_accounts(latest_accounts, existing_accounts):
     """Combines latest and existing accounts, preserving date_first_loaded."""
@@ -299,7 +318,7 @@ def get_fuzzy_match_suggestion(
     unmapped_accounts = []
     unmapped_indices = []
     seq_to_account = {}  # Map sequence numbers to accounts
-    logging.info("Falling back to FuzzyWuzzy for matching suggestion.")
+    logging.info("Falling back to RapidFuzz for matching suggestion.")
 
     for target_account in target_accounts:
         account_id = target_account["id"]
@@ -315,16 +334,60 @@ def get_fuzzy_match_suggestion(
 
     if unmapped_accounts:
         account_names = [acc[0] for acc in unmapped_accounts]
-        best_match_name, confidence = process.extractOne(
-            akahu_account["name"], account_names
+        # default_process lowercases and strips punctuation, matching fuzzywuzzy
+        best_match = process.extractOne(
+            akahu_account["name"],
+            account_names,
+            scorer=fuzz.WRatio,
+            processor=utils.default_process,
+            score_cutoff=50,
         )
-        if confidence >= 50:
-            matched_index = account_names.index(best_match_name)
+        if best_match is not None:
+            _, _, matched_index = best_match
             return unmapped_accounts[matched_index][1]  # Return the sequence number
 
     return 0  # Return integer 0 instead of string "0"
 
 
+def normalize_account_name(name):
+    """Lowercase, strip punctuation and collapse whitespace for name comparison."""
+    return " ".join(re.sub(r"[^\w\s]", " ", name.lower()).split())
+
+
+def get_exact_match_suggestion(
+    akahu_account, target_by_norm, akahu_to_account_mapping, target_account_key
+):
+    """Get account match suggestion from normalized name equality or containment.
+
+    Returns the sequence number of an unmapped target account, or None if there
+    is no exact match and no single unambiguous substring match.
+    """
+    mapped_ids = {
+        mapping.get(target_account_key)
+        for mapping in akahu_to_account_mapping.values()
+    }
+    unmapped = {
+        norm_name: target_account
+        for norm_name, target_account in target_by_norm.items()
+        if target_account["id"] not in mapped_ids
+    }
+
+    akahu_norm = normalize_account_name(akahu_account["name"])
+    if not akahu_norm:
+        return None
+    if akahu_norm in unmapped:
+        return unmapped[akahu_norm]["seq"]
+
+    candidates = [
+        target_account
+        for norm_name, target_account in unmapped.items()
+        if norm_name and (akahu_norm in norm_name or norm_name in akahu_norm)
+    ]
+    if len(candidates) == 1:
+        return candidates[0]["seq"]
+    return None
+
+
 def seq_to_acct(suggested_index, target_accounts):
     """Convert sequence number to account object."""
     return next(
@@ -357,6 +420,17 @@ def match_accounts(
     for idx, target_account in enumerate(target_accounts_list, start=1):
         target_account["seq"] = idx
 
+    # Duplicate normalized names are ambiguous, so leave those to fuzzy matching
+    target_by_norm = {}
+    duplicate_norms = set()
+    for target_account in target_accounts_list:
+        norm_name = normalize_account_name(target_account["name"])
+        if norm_name in target_by_norm:
+            duplicate_norms.add(norm_name)
+        target_by_norm[norm_name] = target_account
+    for norm_name in duplicate_norms:
+        target_by_norm.pop(norm_name)
+
     for akahu_id, akahu_account in sorted(
         akahu_accounts.items(), key=lambda x: x[1]["name"].lower()
     ):
@@ -372,21 +446,28 @@ def match_accounts(
                 )
                 continue
 
-        suggested_index = (
-            get_openai_match_suggestion(
+        suggested_index = get_exact_match_suggestion(
+            akahu_account,
+            target_by_norm,
+            akahu_to_account_mapping,
+            target_account_key,
+        )
+        if suggested_index is not None:
+            logging.info("Found exact name match; skipping fuzzy matching.")
+        elif use_openai:
+            suggested_index = get_openai_match_suggestion(
                 akahu_account,
                 target_accounts_list,
                 akahu_to_account_mapping,
                 target_account_key,
             )
-            if use_openai
-            else get_fuzzy_match_suggestion(
+        else:
+            suggested_index = get_fuzzy_match_suggestion(
                 akahu_account,
                 target_accounts_list,
                 akahu_to_account_mapping,
                 target_account_key,
             )
-        )
 
         print(
             f"\nAkahu Account: {akahu_name} (Connection: {akahu_account['connection']})"
@@ -532,8 +613,8 @@ def remove_seq(data):
 def save_mapping(data_to_save, mapping_file="akahu_budget_mapping.json"):
     """Saves the mapping along with Akahu, Actual, and YNAB accounts to a JSON file."""
     try:
-        serialized_data = json.dumps(data_to_save, indent=4)
-        data_dict = json.loads(serialized_data)
+        # orjson raises on anything that can't be serialized, before the file is touched
+        serialized_data = orjson.dumps(data_to_save, option=orjson.OPT_INDENT_2)
         required_keys = {
             "akahu_accounts",
             "actual_accounts",
@@ -541,13 +622,14 @@ def save_mapping(data_to_save, mapping_file="akahu_budget_mapping.json"):
             "mapping",
         }
 
-        if not required_keys.issubset(data_dict.keys()):
+        if not required_keys.issubset(data_to_save.keys()):
             raise ValueError(
-                f"Serialized data is missing one or more required keys: {required_keys - data_dict.keys()}"
+                f"Serialized data is missing one or more required keys: {required_keys - data_to_save.keys()}"
             )
 
-        with open(mapping_file, "w") as f:
+        with open(mapping_file, "wb") as f:
             f.write(serialized_data)
+        _MAPPING_CACHE.pop(os.path.abspath(mapping_file), None)
     except Exception as e:
         logging.error(f"Failed to save mapping: {e}")
 
@@ -0,0 +1,132 @@
+"""Module for fetching Akahu transactions for many accounts concurrently."""
+
+import asyncio
+from datetime import datetime, timedelta
+import logging
+
+import aiohttp
+import pandas as pd
+
+from modules.config import AKAHU_ENDPOINT, AKAHU_HEADERS
+
+# Cap on simultaneous connections to Akahu
+AKAHU_MAX_CONNECTIONS = 8
+# Same transient statuses the pooled requests sessions retry on
+RETRY_STATUSES = {429, 502, 503, 504}
+MAX_RETRIES = 3
+BACKOFF_FACTOR = 0.5
+# Per-request limit; aiohttp's own default would wait up to 5 minutes
+AKAHU_TIMEOUT = aiohttp.ClientTimeout(total=60)
+# How far back to fetch for an account that has never been synced
+AKAHU_INITIAL_LOOKBACK = timedelta(days=30)
+
+
+def get_akahu_start(last_reconciled_at=None):
+    """Return the Akahu 'start' query value for an account's next fetch.
+
+    One week before last_reconciled_at, or AKAHU_INITIAL_LOOKBACK before now if
+    the account has never been synced.
+    """
+    if last_reconciled_at:
+        last_reconciled_at_dt = datetime.fromisoformat(
+            last_reconciled_at.replace("Z", "+00:00")
+        )
+        start_time = last_reconciled_at_dt - timedelta(weeks=1)
+        return start_time.isoformat().replace("+00:00", "Z")
+    start_time = datetime.utcnow() - AKAHU_INITIAL_LOOKBACK
+    return start_time.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+async def get_json_with_retry(session, url, params):
+    """GET a JSON page, backing off on rate limiting and transient server errors.
+
+    Honours Retry-After when Akahu sends it, otherwise backs off exponentially.
+    """
+    for attempt in range(MAX_RETRIES + 1):
+        async with session.get(url, params=params) as response:
+            if response.status in RETRY_STATUSES and attempt < MAX_RETRIES:
+                retry_after = response.headers.get("Retry-After", "")
+                delay = (
+                    float(retry_after)
+                    if retry_after.isdigit()
+                    else BACKOFF_FACTOR * 2**attempt
+                )
+                logging.warning(
+                    f"Akahu returned {response.status}, retrying in {delay:.1f}s"
+                )
+                await asyncio.sleep(delay)
+                continue
+            response.raise_for_status()
+            return await response.json()
+
+
+async def fetch_account_transactions(session, akahu_account_id, last_reconciled_at):
+    """Fetch all transactions for one Akahu account, following pagination."""
+    url = f"{AKAHU_ENDPOINT}/accounts/{akahu_account_id}/transactions"
+    query_params = {"start": get_akahu_start(last_reconciled_at)}
+    items = []
+
+    while True:
+        try:
+            akahu_txn_json = await get_json_with_retry(session, url, query_params)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            # asyncio.TimeoutError has no message of its own
+            reason = str(e) or "request timed out"
+            logging.error(
+                f"Failed to fetch transactions from Akahu "
+                f"for account {akahu_account_id}: {reason}"
+            )
+            raise RuntimeError(
+                f"Failed to fetch Akahu transactions: {reason}"
+            ) from None
+
+        page = akahu_txn_json.get("items", [])
+        items.extend(page)
+
+        # Stop on an empty page or when there is no next page token
+        cursor = akahu_txn_json.get("cursor") or {}
+        next_cursor = cursor.get("next") if page else None
+        if next_cursor is None:
+            break
+        query_params["cursor"] = next_cursor
+
+    if items:
+        logging.info(
+            f"Fetched {len(items)} transactions from Akahu for account {akahu_account_id}."
+        )
+    return pd.DataFrame(items)
+
+
+async def fetch_all_transactions(accounts, session):
+    """Fetch transactions for several Akahu accounts concurrently.
+
+    Args:
+        accounts: Dictionary of Akahu account ID to last sync time (or None)
+        session: aiohttp.ClientSession carrying the Akahu headers
+
+    Returns:
+        Dictionary of Akahu account ID to DataFrame of transactions
+    """
+    account_ids = list(accounts)
+    results = await asyncio.gather(
+        *(
+            fetch_account_transactions(session, account_id, accounts[account_id])
+            for account_id in account_ids
+        )
+    )
+    return dict(zip(account_ids, results))
+
+
+async def _fetch_all_akahu(accounts):
+    connector = aiohttp.TCPConnector(limit=AKAHU_MAX_CONNECTIONS)
+    async with aiohttp.ClientSession(
+        headers=dict(AKAHU_HEADERS), connector=connector, timeout=AKAHU_TIMEOUT
+    ) as session:
+        return await fetch_all_transactions(accounts, session)
+
+
+def fetch_all_akahu(accounts):
+    """Synchronous entry point: fetch transactions for all accounts in one event loop."""
+    if not accounts:
+        return {}
+    return asyncio.run(_fetch_all_akahu(accounts))
@@ -0,0 +1,260 @@
+"""Module for building the Flask application and running scheduled syncs.
+
+Shared by the `python flask_app.py` entry point and the WSGI import path so
+both use the same Actual client, sync routine and scheduler.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime
+import copy
+import logging
+import os
+import shutil
+import sys
+import tempfile
+
+import requests
+from actual import Actual
+from apscheduler.schedulers.background import BackgroundScheduler
+
+from modules.sync_handler import sync_to_ab, sync_to_ynab
+from modules.account_mapper import load_existing_mapping
+from modules.config import AKAHU_ENDPOINT, AKAHU_HEADERS
+from modules.config import run_sync_to_ab, run_sync_to_ynab, validate_required
+from modules.config import actual_cache_dir, force_refresh
+from modules.config import ENVs
+from modules.webhook_handler import create_flask_app
+
+try:
+    import fcntl
+except ImportError:  # Windows has no flock; single-process dev runs don't need it
+    fcntl = None
+
+# Scheduler instance, kept at module level so signal_handler can shut it down
+scheduler = None
+
+# Held open for the life of the process that owns the scheduler
+SCHEDULER_LOCK_FILE = os.path.join(tempfile.gettempdir(), "akahu_sync.lock")
+_scheduler_lock = None
+
+
+@contextmanager
+def get_actual_data_dir():
+    """Context manager that yields the data_dir for one Actual connection.
+
+    The shared cache lets actualpy reuse its SQLite copy and only apply new sync
+    messages, re-downloading the whole budget only when the remote groupId has
+    changed. FORCE_REFRESH deletes the cache so the next connection starts clean.
+
+    The scheduler, web requests and other WSGI workers can all connect at once,
+    so the cache is guarded by an flock on a sibling lock file. A connection that
+    finds it held gets a private temporary directory instead of waiting.
+    """
+    data_dir = os.path.join(actual_cache_dir(), ENVs['ACTUAL_SYNC_ID'])
+    os.makedirs(actual_cache_dir(), exist_ok=True)
+
+    with open(f"{data_dir}.lock", "w") as lock_file:
+        if fcntl is not None:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                logging.info(f"Actual cache at {data_dir} is in use - using a temporary copy.")
+                with tempfile.TemporaryDirectory(prefix="akahu_actual_") as tmp_dir:
+                    yield tmp_dir
+                return
+
+        # Closing lock_file on exit releases the flock
+        if force_refresh() and os.path.isdir(data_dir):
+            logging.info(f"Force refresh requested - deleting cached budget at {data_dir}")
+            shutil.rmtree(data_dir)
+        os.makedirs(data_dir, exist_ok=True)
+        yield data_dir
+
+
+@contextmanager
+def get_actual_client():
+    """Context manager that yields an Actual client if RUN_SYNC_TO_AB is True,
+    or None otherwise.
+    This is needed because actualpy only works with contextmanager
+    """
+    if run_sync_to_ab():
+        try:
+            logging.info(f"Attempting to connect to Actual server at {ENVs['ACTUAL_SERVER_URL']}")
+
+            # NOTE: This is where the decryption happens using the ACTUAL_ENCRYPTION_KEY
+            with get_actual_data_dir() as data_dir, Actual(
+                base_url=ENVs['ACTUAL_SERVER_URL'],
+                password=ENVs['ACTUAL_PASSWORD'],
+                file=ENVs['ACTUAL_SYNC_ID'],
+                data_dir=data_dir,
+            ) as client:
+                logging.info(f"Connected to AB: {client}")
+                yield client
+        except requests.exceptions.RequestException as e:
+            logging.error(f"Failed to connect to Actual server: {str(e)}")
+            if hasattr(e, 'response') and e.response is not None:
+                logging.error(f"Response status: {e.response.status_code}")
+                logging.error(f"Response headers: {dict(e.response.headers)}")
+                logging.error(f"Response content: {e.response.text[:500]}")
+            raise RuntimeError(f"Failed to connect to Actual server: {str(e)}") from None
+    else:
+        yield None
+
+
+def signal_handler(sig, frame):
+    logging.info("Received signal to terminate. Shutting down gracefully...")
+    # Attempt to shut down the scheduler if it's running
+    if scheduler is not None and scheduler.running:
+        scheduler.shutdown(wait=False)
+    sys.exit(0)
+
+
+def scheduler_enabled():
+    """Return True unless RUN_SCHEDULER is set to something other than 'true'."""
+    return ENVs.get('RUN_SCHEDULER', 'true').lower() == 'true'
+
+
+def acquire_scheduler_lock():
+    """Try to take the process-wide scheduler lock without blocking.
+
+    Gunicorn imports the app once per worker, so without this every worker would
+    run its own copy of the polling job. Returns True if this process owns it.
+    """
+    global _scheduler_lock
+    if fcntl is None or _scheduler_lock is not None:
+        return True
+    lock_file = open(SCHEDULER_LOCK_FILE, "w")
+    try:
+        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        lock_file.close()
+        return False
+    _scheduler_lock = lock_file
+    return True
+
+
+def start_scheduler(development_mode=False):
+    """Initializes and starts the APScheduler for periodic sync.
+    The job is configured to run immediately and then every 4 hours.
+
+    Only one process runs the scheduler. With the Werkzeug reloader it starts in
+    the reloader child rather than the watcher parent, and across WSGI workers
+    the first to take SCHEDULER_LOCK_FILE wins.
+    """
+    global scheduler
+    if not scheduler_enabled():
+        logging.info("RUN_SCHEDULER is disabled - not starting polling scheduler.")
+        return
+
+    if development_mode and os.environ.get('WERKZEUG_RUN_MAIN') != 'true':
+        logging.info("Werkzeug reloader parent - scheduler will start in the reloader child.")
+        return
+
+    if not acquire_scheduler_lock():
+        logging.info(f"Another process holds {SCHEDULER_LOCK_FILE} - not starting polling scheduler.")
+        return
+
+    logging.info("Initializing APScheduler for 4-hourly polling sync.")
+    scheduler = BackgroundScheduler()
+
+    # Schedule the run_sync function to run immediately (start_date=datetime.now())
+    # and then repeat every 4 hours (trigger='interval', hours=4).
+    scheduler.add_job(
+        func=run_sync,
+        trigger='interval',
+        hours=4,
+        start_date=datetime.now(), # FIX: Starts the job immediately upon scheduler startup
+        misfire_grace_time=600,
+        max_instances=1,
+        id='akahu_polling_sync'  # Single instance: guarded by SCHEDULER_LOCK_FILE
+    )
+
+    # Removed the second job that used run_date='now' to fix the ValueError.
+
+    scheduler.start()
+    logging.info("Polling scheduler started. Sync runs now and every 4 hours.")
+
+
+def create_application():
+    """Create Flask application."""
+    validate_required()
+    _, _, _, mapping_list = load_existing_mapping()
+
+    # Pass the factory rather than a client: handlers open their own connection
+    # per request, so booting the app doesn't download the budget.
+    # The scheduled job (run_sync) handles its own connection.
+    return create_flask_app(get_actual_client, mapping_list, {
+        'AKAHU_PUBLIC_KEY': ENVs.get('AKAHU_PUBLIC_KEY', ''),  # RFU (Reserved For Future Use)
+        'akahu_endpoint': AKAHU_ENDPOINT,
+        'akahu_headers': AKAHU_HEADERS
+    })
+
+
+def sync_actual(mapping_list, debug_mode=None):
+    """Open an Actual client and sync to Actual Budget.
+
+    Entering the client context already loads the budget, so no separate
+    download_budget() call is needed here.
+    """
+    with get_actual_client() as actual_client:
+        if not actual_client:
+            return 0
+        return sync_to_ab(actual_client, mapping_list, debug_mode=debug_mode)
+
+
+def run_sync(account_ids=None, debug_mode=None):
+    """Run sync operations directly.
+
+    Args:
+        account_ids (list[str], optional): List of Akahu account IDs to sync. If None, all accounts will be synced.
+        debug_mode (str, optional): Debug mode setting. 'all' to print all transaction IDs, or a specific Akahu transaction ID for verbose debugging.
+    """
+    logging.info("Starting direct sync (Scheduled Polling Job)...")
+    validate_required()
+    actual_count = ynab_count = 0
+
+    _, _, _, mapping_list = load_existing_mapping()
+
+    if account_ids:
+        # Filter mapping_list to only include specified accounts
+        filtered_mapping = {k: v for k, v in mapping_list.items() if k in account_ids}
+        if not filtered_mapping:
+            logging.warning(f"No matching accounts found for IDs: {account_ids}")
+            return
+        logging.info(f"Syncing specific accounts: {', '.join(account_ids)}")
+        mapping_list = filtered_mapping
+
+    # Actual and YNAB are independent remote services, so sync them concurrently.
+    # Each side gets its own copy of the mapping because both annotate entries.
+    ab_future = ynab_future = None
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        if run_sync_to_ab():
+            ab_future = pool.submit(
+                sync_actual, copy.deepcopy(mapping_list), debug_mode=debug_mode
+            )
+        if run_sync_to_ynab():
+            ynab_future = pool.submit(
+                sync_to_ynab, copy.deepcopy(mapping_list), debug_mode=debug_mode
+            )
+
+    # Report both outcomes before surfacing the first failure
+    errors = []
+    if ab_future is not None:
+        try:
+            actual_count = ab_future.result()
+            logging.info(f"Synced {actual_count} accounts to Actual Budget.")
+        except Exception as e:
+            logging.error(f"Sync to Actual Budget failed: {str(e)}")
+            errors.append(e)
+    if ynab_future is not None:
+        try:
+            ynab_count = ynab_future.result()
+            logging.info(f"Synced {ynab_count} accounts to YNAB.")
+        except Exception as e:
+            logging.error(f"Sync to YNAB failed: {str(e)}")
+            errors.append(e)
+    if errors:
+        raise errors[0]
+
+    logging.info(f"Sync completed. Actual count: {actual_count}, YNAB count: {ynab_count}")
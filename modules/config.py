@@ -1,13 +1,20 @@
-"""Module for handling configuration and environment variables."""
+"""Module for handling configuration and environment variables.
 
+Nothing is read or validated at import time. The .env file is loaded on first
+access, each variable is checked when it is used, and entry points call
+validate_required() before starting a sync.
+"""
+
+import functools
 import os
 import logging
+import tempfile
+from collections.abc import Mapping
+import requests
 from dotenv import load_dotenv
-
-# Load environment variables with override=True to ensure .env values are used
-load_dotenv(verbose=True, override=True)
-
-# Debug logging for environment variables
+from requests.adapters import HTTPAdapter
+from requests.auth import AuthBase
+from urllib3.util.retry import Retry
 
 required_envs = [
     "ACTUAL_SERVER_URL",
@@ -20,35 +27,143 @@ required_envs = [
     "RUN_SYNC_TO_AB",
 ]
 
-# Load environment variables into a dictionary for validation
-ENVs = {key: os.getenv(key) for key in required_envs}
 
-# Validate environment variables
-for key, value in ENVs.items():
-    if value is None:
-        raise EnvironmentError(f"Missing required environment variable: {key}")
+@functools.cache
+def load_env():
+    """Load the .env file once, with override=True to ensure .env values are used."""
+    load_dotenv(verbose=True, override=True)
+
+
+class _LazyEnv:
+    """Read-only view of the environment that loads .env on first access."""
+
+    def __getitem__(self, key):
+        load_env()
+        value = os.getenv(key)
+        if value is None:
+            raise EnvironmentError(f"Missing required environment variable: {key}")
+        return value
+
+    def get(self, key, default=None):
+        load_env()
+        return os.getenv(key, default)
+
+
+ENVs = _LazyEnv()
+
+
+class _LazyHeaders(Mapping):
+    """Header mapping whose values are built from ENVs only when read."""
+
+    def __init__(self, build):
+        self._build = build
+
+    def __getitem__(self, key):
+        return self._build()[key]
+
+    def __iter__(self):
+        return iter(self._build())
+
+    def __len__(self):
+        return len(self._build())
+
+
+class _HeaderAuth(AuthBase):
+    """Attach a header mapping to every request sent through a session."""
+
+    def __init__(self, headers):
+        self.headers = headers
+
+    def __call__(self, r):
+        r.headers.update(self.headers)
+        return r
+
 
 # API endpoints and headers
 YNAB_ENDPOINT = "https://api.ynab.com/v1/"
-YNAB_HEADERS = {"Authorization": f"Bearer {ENVs['YNAB_BEARER_TOKEN']}"}
+YNAB_HEADERS = _LazyHeaders(
+    lambda: {"Authorization": f"Bearer {ENVs['YNAB_BEARER_TOKEN']}"}
+)
 
 AKAHU_ENDPOINT = "https://api.akahu.io/v1/"
-AKAHU_HEADERS = {
-    "Authorization": f"Bearer {ENVs['AKAHU_USER_TOKEN']}",
-    "X-Akahu-ID": ENVs["AKAHU_APP_TOKEN"],
-}
-
-# Load boolean flags from environment variables with defaults
-RUN_SYNC_TO_YNAB = ENVs["RUN_SYNC_TO_YNAB"].lower() == "true"
-RUN_SYNC_TO_AB = ENVs["RUN_SYNC_TO_AB"].lower() == "true"
-FORCE_REFRESH = os.getenv("FORCE_REFRESH", "false").lower() == "true"
-DEBUG_SYNC = os.getenv("DEBUG_SYNC", "false").lower() == "true"
-
-# Validate that at least one sync target is enabled
-if not RUN_SYNC_TO_YNAB and not RUN_SYNC_TO_AB:
-    logging.error(
-        "Environment variable RUN_SYNC_TO_YNAB or RUN_SYNC_TO_AB must be True."
+AKAHU_HEADERS = _LazyHeaders(
+    lambda: {
+        "Authorization": f"Bearer {ENVs['AKAHU_USER_TOKEN']}",
+        "X-Akahu-ID": ENVs["AKAHU_APP_TOKEN"],
+    }
+)
+
+
+def create_session(headers):
+    """Create a pooled requests session that retries transient failures.
+
+    Reusing one session per backend keeps TCP/TLS connections alive between calls.
+    Only idempotent methods are retried, so POSTs are never silently replayed, and
+    the last response is returned as-is so callers keep their own status handling.
+    """
+    session = requests.Session()
+    session.auth = _HeaderAuth(headers)
+    retries = Retry(
+        total=3,
+        backoff_factor=0.3,
+        status_forcelist=[429, 502, 503, 504],
+        raise_on_status=False,
     )
-    raise EnvironmentError(
-        "Environment variable RUN_SYNC_TO_YNAB or RUN_SYNC_TO_AB must be True."
+    session.mount(
+        "https://",
+        HTTPAdapter(pool_connections=4, pool_maxsize=16, max_retries=retries),
+    )
+    return session
+
+
+YNAB_SESSION = create_session(YNAB_HEADERS)
+AKAHU_SESSION = create_session(AKAHU_HEADERS)
+
+
+# Boolean flags from environment variables, read once on first use
+@functools.cache
+def run_sync_to_ynab():
+    return ENVs["RUN_SYNC_TO_YNAB"].lower() == "true"
+
+
+@functools.cache
+def run_sync_to_ab():
+    return ENVs["RUN_SYNC_TO_AB"].lower() == "true"
+
+
+@functools.cache
+def force_refresh():
+    return ENVs.get("FORCE_REFRESH", "false").lower() == "true"
+
+
+@functools.cache
+def debug_sync():
+    return ENVs.get("DEBUG_SYNC", "false").lower() == "true"
+
+
+@functools.cache
+def actual_cache_dir():
+    """Local copies of Actual budgets, reused between connections when the
+    remote sync id (groupId) is unchanged."""
+    return ENVs.get(
+        "ACTUAL_CACHE_DIR", os.path.join(tempfile.gettempdir(), "akahu_actual_cache")
     )
+
+
+@functools.cache
+def validate_required():
+    """Validate required environment variables and that a sync target is enabled.
+
+    Call this at the start of a sync or app boot. Successful validation is cached.
+    """
+    for key in required_envs:
+        ENVs[key]
+
+    # Validate that at least one sync target is enabled
+    if not run_sync_to_ynab() and not run_sync_to_ab():
+        logging.error(
+            "Environment variable RUN_SYNC_TO_YNAB or RUN_SYNC_TO_AB must be True."
+        )
+        raise EnvironmentError(
+            "Environment variable RUN_SYNC_TO_YNAB or RUN_SYNC_TO_AB must be True."
+        )
@@ -1,28 +1,33 @@
 from datetime import datetime
 import logging
+import threading
+import pandas as pd
 from modules.account_fetcher import get_akahu_balance, get_ynab_balance
 from modules.account_mapper import load_existing_mapping, save_mapping
+from modules.akahu_async import fetch_all_akahu
 from modules.transaction_handler import (
     clean_txn_for_ynab,
     create_adjustment_txn_ynab,
-    get_all_akahu,
     handle_tracking_account_actual,
     load_transactions_into_actual,
     load_transactions_into_ynab,
 )
 from modules.config import (
-    RUN_SYNC_TO_AB,
-    RUN_SYNC_TO_YNAB,
     YNAB_ENDPOINT,
     YNAB_HEADERS,
     AKAHU_ENDPOINT,
     AKAHU_HEADERS,
-    FORCE_REFRESH,
-    DEBUG_SYNC,
+    force_refresh,
+    debug_sync,
 )
 from actual.protobuf_models import SyncRequest
 
 
+# Serializes read-modify-write of the mapping file when Actual and YNAB sync
+# concurrently
+_MAPPING_FILE_LOCK = threading.Lock()
+
+
 def get_account_priority(account_entry):
     """
     Determine processing priority for accounts.
@@ -45,30 +50,35 @@ def update_mapping_timestamps(
     mapping_file="akahu_budget_mapping.json",
 ):
     """Update sync timestamps for multiple accounts in a single operation."""
-    akahu_accounts, actual_accounts, ynab_accounts, mappings = load_existing_mapping(
-        mapping_file
-    )
-    current_time = datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%SZ")
-
-    if successful_ab_syncs:
-        for akahu_id in successful_ab_syncs:
-            if akahu_id in mappings and not mappings[akahu_id].get("actual_do_not_map"):
-                mappings[akahu_id]["actual_synced_datetime"] = current_time
-
-    if successful_ynab_syncs:
-        for akahu_id in successful_ynab_syncs:
-            if akahu_id in mappings and not mappings[akahu_id].get("ynab_do_not_map"):
-                mappings[akahu_id]["ynab_synced_datetime"] = current_time
-
-    save_mapping(
-        {
-            "akahu_accounts": akahu_accounts,
-            "actual_accounts": actual_accounts,
-            "ynab_accounts": ynab_accounts,
-            "mapping": mappings,
-        },
-        mapping_file,
-    )
+    with _MAPPING_FILE_LOCK:
+        akahu_accounts, actual_accounts, ynab_accounts, mappings = (
+            load_existing_mapping(mapping_file)
+        )
+        current_time = datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%SZ")
+
+        if successful_ab_syncs:
+            for akahu_id in successful_ab_syncs:
+                if akahu_id in mappings and not mappings[akahu_id].get(
+                    "actual_do_not_map"
+                ):
+                    mappings[akahu_id]["actual_synced_datetime"] = current_time
+
+        if successful_ynab_syncs:
+            for akahu_id in successful_ynab_syncs:
+                if akahu_id in mappings and not mappings[akahu_id].get(
+                    "ynab_do_not_map"
+                ):
+                    mappings[akahu_id]["ynab_synced_datetime"] = current_time
+
+        save_mapping(
+            {
+                "akahu_accounts": akahu_accounts,
+                "actual_accounts": actual_accounts,
+                "ynab_accounts": ynab_accounts,
+                "mapping": mappings,
+            },
+            mapping_file,
+        )
 
 
 def sync_to_ynab(mapping_list, debug_mode=None):
@@ -81,19 +91,33 @@ def sync_to_ynab(mapping_list, debug_mode=None):
     """
     successful_syncs = set()
     transactions_uploaded = 0
+    # Cleaned transactions and their Akahu account IDs, per YNAB budget, posted
+    # in bulk once every account has been fetched
+    pending_txns = {}
+    pending_accounts = {}
 
     # Sort accounts to process on-budget accounts first
     sorted_accounts = sorted(mapping_list.items(), key=get_account_priority)
 
+    # Fetch Akahu transactions for every syncable on-budget account concurrently
+    akahu_txns = fetch_all_akahu(
+        {
+            akahu_account_id: mapping_entry.get("ynab_synced_datetime")
+            for akahu_account_id, mapping_entry in sorted_accounts
+            if mapping_entry.get("account_type", "On Budget") == "On Budget"
+            and not mapping_entry.get("ynab_do_not_map")
+            and mapping_entry.get("ynab_budget_id")
+            and mapping_entry.get("ynab_account_id")
+        }
+    )
+
     for akahu_account_id, mapping_entry in sorted_accounts:
         ynab_budget_id = mapping_entry.get("ynab_budget_id")
         ynab_account_id = mapping_entry.get("ynab_account_id")
         ynab_account_name = mapping_entry.get("ynab_account_name")
         akahu_account_name = mapping_entry.get("akahu_name")
         account_type = mapping_entry.get("account_type", "On Budget")
-        last_reconciled_at = mapping_entry.get(
-            "ynab_synced_datetime", "2024-01-01T00:00:00Z"
-        )
+        last_reconciled_at = mapping_entry.get("ynab_synced_datetime")
         if mapping_entry.get("ynab_do_not_map"):
             logging.debug(
                 f"Skipping sync to YNAB for Akahu account {akahu_account_id}: account is configured to not be mapped."
@@ -109,7 +133,7 @@ def sync_to_ynab(mapping_list, debug_mode=None):
         logging.info(
             f"Processing Akahu account: {akahu_account_name} ({akahu_account_id}) linked to YNAB account: {ynab_account_name} ({ynab_account_id})"
         )
-        logging.info(f"Last synced: {last_reconciled_at}")
+        logging.info(f"Last synced: {last_reconciled_at or 'Never'}")
 
         if account_type == "Tracking":
             logging.info(f"Working on tracking account: {ynab_account_name}")
@@ -151,27 +175,30 @@ def sync_to_ynab(mapping_list, debug_mode=None):
             successful_syncs.add(akahu_account_id)
 
         elif account_type == "On Budget":
-            akahu_df = get_all_akahu(
-                akahu_account_id, AKAHU_ENDPOINT, AKAHU_HEADERS, last_reconciled_at
-            )
+            akahu_df = akahu_txns.get(akahu_account_id)
 
             if akahu_df is not None and not akahu_df.empty:
                 # Clean and prepare transactions for YNAB
                 cleaned_txn = clean_txn_for_ynab(akahu_df, ynab_account_id)
-
-                # Load transactions into YNAB
-                transactions_uploaded += load_transactions_into_ynab(
-                    cleaned_txn,
-                    mapping_entry["ynab_budget_id"],
-                    mapping_entry["ynab_account_id"],
-                    YNAB_ENDPOINT,
-                    YNAB_HEADERS,
-                    debug_mode=debug_mode
+                pending_txns.setdefault(ynab_budget_id, []).append(cleaned_txn)
+                pending_accounts.setdefault(ynab_budget_id, set()).add(
+                    akahu_account_id
                 )
-                successful_syncs.add(akahu_account_id)
         else:
             logging.error(f"Unknown account type for Akahu account: {akahu_account_id}")
 
+    # Load transactions into YNAB, one bulk upload per budget
+    for ynab_budget_id, cleaned_txns in pending_txns.items():
+        transactions_uploaded += load_transactions_into_ynab(
+            pd.concat(cleaned_txns, ignore_index=True),
+            ynab_budget_id,
+            None,
+            YNAB_ENDPOINT,
+            YNAB_HEADERS,
+            debug_mode=debug_mode
+        )
+        successful_syncs.update(pending_accounts[ynab_budget_id])
+
     if successful_syncs:
         update_mapping_timestamps(successful_ynab_syncs=successful_syncs)
     return transactions_uploaded
@@ -187,7 +214,7 @@ def sync_to_ab(actual, mapping_list, debug_mode=None):
                    or a specific Akahu transaction ID for verbose debugging.
     """
     # Force a complete refresh of the budget at the start
-    if FORCE_REFRESH:
+    if force_refresh():
         logging.info(
             "Force refresh requested - closing session and downloading fresh budget..."
         )
@@ -200,18 +227,31 @@ def sync_to_ab(actual, mapping_list, debug_mode=None):
 
     successful_ab_syncs = set()
     transactions_uploaded = 0
+    # On-budget loads are committed once, either before the first tracking
+    # account reads balances or in the final commit below
+    uncommitted_loads = False
 
     # Sort accounts to process on-budget accounts first
     sorted_accounts = sorted(mapping_list.items(), key=get_account_priority)
 
+    # Fetch Akahu transactions for every syncable on-budget account concurrently
+    akahu_txns = fetch_all_akahu(
+        {
+            akahu_account_id: mapping_entry.get("actual_synced_datetime")
+            for akahu_account_id, mapping_entry in sorted_accounts
+            if mapping_entry.get("account_type", "On Budget") == "On Budget"
+            and not mapping_entry.get("actual_do_not_map")
+            and mapping_entry.get("actual_budget_id")
+            and mapping_entry.get("actual_account_id")
+        }
+    )
+
     for akahu_account_id, mapping_entry in sorted_accounts:
         actual_account_id = mapping_entry.get("actual_account_id")
         actual_account_name = mapping_entry.get("actual_account_name")
         akahu_account_name = mapping_entry.get("akahu_name")
         account_type = mapping_entry.get("account_type", "On Budget")
-        last_reconciled_at = mapping_entry.get(
-            "actual_synced_datetime", "2024-01-01T00:00:00Z"
-        )
+        last_reconciled_at = mapping_entry.get("actual_synced_datetime")
 
         if mapping_entry.get("actual_do_not_map"):
             logging.debug(
@@ -231,9 +271,13 @@ def sync_to_ab(actual, mapping_list, debug_mode=None):
         logging.info(
             f"Processing Akahu account: {akahu_account_name} ({akahu_account_id}) linked to Actual account: {actual_account_name} ({actual_account_id})"
         )
-        logging.info(f"Last synced: {last_reconciled_at}")
+        logging.info(f"Last synced: {last_reconciled_at or 'Never'}")
 
         if account_type == "Tracking":
+            if uncommitted_loads:
+                actual.commit()
+                uncommitted_loads = False
+
             # Update balance for mapping entry
             akahu_balance = get_akahu_balance(
                 akahu_account_id, AKAHU_ENDPOINT, AKAHU_HEADERS
@@ -250,15 +294,15 @@ def sync_to_ab(actual, mapping_list, debug_mode=None):
             )  # Note either 1 or 0 returned
             successful_ab_syncs.add(akahu_account_id)
         elif account_type == "On Budget":
-            akahu_df = get_all_akahu(
-                akahu_account_id, AKAHU_ENDPOINT, AKAHU_HEADERS, last_reconciled_at
-            )
+            akahu_df = akahu_txns.get(akahu_account_id)
 
             if akahu_df is not None and not akahu_df.empty:
                 logging.info("About to load transactions into Actual Budget...")
                 transactions_uploaded += load_transactions_into_actual(
-                    akahu_df, mapping_entry, actual, debug_mode=debug_mode
+                    akahu_df, mapping_entry, actual, debug_mode=debug_mode,
+                    commit=False
                 )
+                uncommitted_loads = True
                 successful_ab_syncs.add(akahu_account_id)
         else:
             logging.error(f"Unknown account type for Akahu account: {akahu_account_id}")
@@ -267,11 +311,11 @@ def sync_to_ab(actual, mapping_list, debug_mode=None):
     # Commit all changes after processing all accounts
     any_transactions_processed = transactions_uploaded > 0
     if any_transactions_processed:
-        if DEBUG_SYNC:
+        if debug_sync():
             logging.info("Finished processing all accounts, about to commit...")
         try:
             commit_result = actual.commit()
-            if DEBUG_SYNC:
+            if debug_sync():
                 logging.info(f"Commit result: {commit_result}")
 
             # Get sync changes
@@ -287,14 +331,14 @@ def sync_to_ab(actual, mapping_list, debug_mode=None):
                 client_id=actual._client.client_id, now=datetime.now()
             )
             changes = actual.sync_sync(request)
-            if DEBUG_SYNC:
+            if debug_sync():
                 logging.info(
                     f"Sync changes: {changes.get_messages(actual._master_key)}"
                 )
 
             # Get downloaded budget data
             file_bytes = actual.download_user_file(actual._file.file_id)
-            if DEBUG_SYNC:
+            if debug_sync():
                 logging.info(f"Downloaded budget size: {len(file_bytes)} bytes")
 
             actual.download_budget()  # Force refresh after commit
@@ -18,7 +18,7 @@ from actual.queries import (
 from typing import Dict
 
 from modules.account_fetcher import get_actual_balance
-from modules.config import AKAHU_HEADERS
+from modules.config import AKAHU_HEADERS, AKAHU_SESSION, YNAB_SESSION
 
 
 def get_cached_names(actual) -> tuple[Dict[str, str], Dict[str, str]]:
@@ -101,80 +101,9 @@ def log_balance_comparison(
     )
 
 
-def get_all_akahu(
-    akahu_account_id, akahu_endpoint, akahu_headers, last_reconciled_at=None
+def load_transactions_into_actual(
+    transactions, mapping_entry, actual, debug_mode=None, commit=True
 ):
-    """Fetch all transactions from Akahu for a given account, supporting pagination."""
-    query_params = {}
-    res = None
-    total_txn = 0
-
-    if last_reconciled_at:
-        last_reconciled_at_dt = datetime.fromisoformat(
-            last_reconciled_at.replace("Z", "+00:00")
-        )
-        start_time = last_reconciled_at_dt - timedelta(weeks=1)
-        query_params["start"] = start_time.isoformat().replace("+00:00", "Z")
-    else:
-        query_params["start"] = "2024-01-01T00:00:00Z"
-
-    next_cursor = "first time"
-    while next_cursor is not None:
-        if next_cursor != "first time":
-            query_params["cursor"] = next_cursor
-
-        try:
-            response = requests.get(
-                f"{akahu_endpoint}/accounts/{akahu_account_id}/transactions",
-                params=query_params,
-                headers=akahu_headers,
-            )
-            response.raise_for_status()
-            
-            akahu_txn_json = response.json()
-            akahu_txn = pd.DataFrame(akahu_txn_json.get("items", []))
-
-            # TODO: Enrichment endpoint requires different authentication
-            # for _, txn in akahu_txn.iterrows():
-            #     enrich_transaction(txn, akahu_endpoint, akahu_headers)
-
-        except requests.exceptions.RequestException as e:
-            logging.error(
-                f"Failed to fetch transactions from Akahu "
-                f"for account {akahu_account_id}: {str(e)}"
-            )
-            raise RuntimeError(
-                f"Failed to fetch Akahu transactions: {str(e)}"
-            ) from None
-
-        if res is None:
-            res = akahu_txn.copy()
-        else:
-            res = pd.concat([res, akahu_txn])
-
-        num_txn = akahu_txn.shape[0]
-        total_txn += num_txn
-        # Check if we've reached the end of pagination:
-        # - No transactions in this page, or
-        # - No cursor in response, or
-        # - No next page token in cursor
-        has_more_pages = (
-            num_txn > 0
-            and "cursor" in akahu_txn_json
-            and "next" in akahu_txn_json["cursor"]
-        )
-
-        if has_more_pages:
-            next_cursor = akahu_txn_json["cursor"]["next"]
-        else:
-            next_cursor = None  # End of pagination
-
-    if total_txn > 0:
-        logging.info(f"Fetched {total_txn} transactions from Akahu.")
-    return res
-
-
-def load_transactions_into_actual(transactions, mapping_entry, actual, debug_mode=None):
     """Load transactions into Actual Budget using the mapping information.
     
     Args:
@@ -183,6 +112,8 @@ def load_transactions_into_actual(transactions, mapping_entry, actual, debug_mod
         actual: Actual Budget client instance
         debug_mode: Debug mode setting. 'all' to print all transaction IDs,
                    or a specific Akahu transaction ID for verbose debugging.
+        commit: Commit to Actual once loaded. Pass False when the caller batches
+                several accounts and commits once at the end.
     """
     if transactions is None or transactions.empty:
         logging.info("No transactions to load into Actual.")
@@ -369,6 +300,9 @@ def load_transactions_into_actual(transactions, mapping_entry, actual, debug_mod
         "%Y-%m-%dT%H:%M:%SZ"
     )
 
+    if not commit:
+        return len(imported_transactions)
+
     # Commit all changes to Actual
     try:
         actual.commit()
@@ -455,7 +389,7 @@ def enrich_transaction(transaction_data, akahu_endpoint, akahu_headers):
     """Print enrichment data for a transaction."""
     try:
         # Call the Akahu enrichment API with standard auth headers
-        response = requests.post(
+        response = AKAHU_SESSION.post(
             "https://api.genie.akahu.io/v1/search",
             headers=AKAHU_HEADERS,  # Use the standard Akahu headers
             json={
@@ -530,7 +464,7 @@ def get_ynab_transactions(ynab_budget_id, ynab_endpoint, ynab_headers):
     """Fetch all transactions from YNAB for a given budget."""
     uri = f"{ynab_endpoint}budgets/{ynab_budget_id}/transactions"
     try:
-        response = requests.get(uri, headers=ynab_headers)
+        response = YNAB_SESSION.get(uri, headers=ynab_headers)
         response.raise_for_status()
         return response.json().get("data", {}).get("transactions", [])
     except requests.exceptions.RequestException as e:
@@ -540,16 +474,50 @@ def get_ynab_transactions(ynab_budget_id, ynab_endpoint, ynab_headers):
         raise
 
 
+YNAB_MAX_BATCH_TRANSACTIONS = 1000
+YNAB_MAX_BATCH_BYTES = 1024 * 1024
+
+
+def chunk_ynab_transactions(
+    transactions_list,
+    max_transactions=YNAB_MAX_BATCH_TRANSACTIONS,
+    max_bytes=YNAB_MAX_BATCH_BYTES,
+):
+    """Split transactions into batches small enough for one YNAB bulk request.
+
+    A batch is flushed once it reaches max_transactions, or before adding a
+    transaction would take its serialized size past max_bytes.
+    """
+    batch = []
+    batch_bytes = 0
+    for txn in transactions_list:
+        txn_bytes = len(json.dumps(txn, default=str))
+        if batch and (
+            len(batch) >= max_transactions or batch_bytes + txn_bytes > max_bytes
+        ):
+            yield batch
+            batch = []
+            batch_bytes = 0
+        batch.append(txn)
+        batch_bytes += txn_bytes
+    if batch:
+        yield batch
+
+
 def load_transactions_into_ynab(
     akahu_txn, ynab_budget_id, ynab_account_id, ynab_endpoint, ynab_headers,
     debug_mode=None
 ):
     """Save transactions from Akahu to YNAB.
+
+    Transactions are posted to the bulk endpoint in as few requests as the batch
+    limits allow. Each row carries its own account_id, so one call can cover
+    several accounts in the same budget.
     
     Args:
         akahu_txn: DataFrame of transactions to load
         ynab_budget_id: YNAB budget ID
-        ynab_account_id: YNAB account ID
+        ynab_account_id: YNAB account ID, or None when loading several accounts
         ynab_endpoint: YNAB API endpoint
         ynab_headers: YNAB API headers
         debug_mode: Debug mode setting. 'all' to print all transaction IDs,
@@ -557,26 +525,38 @@ def load_transactions_into_ynab(
     """
     uri = f"{ynab_endpoint}budgets/{ynab_budget_id}/transactions"
     transactions_list = akahu_txn.to_dict(orient="records")
+    target = (
+        f"account {ynab_account_id}" if ynab_account_id else f"budget {ynab_budget_id}"
+    )
 
     # Debug logging for transactions
     if debug_mode == 'all':
         for txn in transactions_list:
             logging.info(f"Processing transaction: {txn['import_id']} - {txn['payee_name']} ${float(txn['amount'])/1000:.2f}")
 
-    ynab_api_payload = {"transactions": transactions_list}
+    duplicates = []
+    new_txns = []
+    for batch in chunk_ynab_transactions(transactions_list):
+        ynab_api_payload = {"transactions": batch}
 
-    try:
-        response = requests.post(uri, headers=ynab_headers, json=ynab_api_payload)
-        response.raise_for_status()
-    except requests.exceptions.RequestException as e:
-        logging.error(
-            f"Failed to post transactions to YNAB "
-            f"for account {ynab_account_id}: {str(e)}"
-        )
-        raise RuntimeError(f"Failed to load transactions into YNAB: {str(e)}") from None
+        try:
+            response = YNAB_SESSION.post(
+                uri, headers=ynab_headers, json=ynab_api_payload
+            )
+            response.raise_for_status()
+        except requests.exceptions.RequestException as e:
+            logging.error(
+                f"Failed to post transactions to YNAB "
+                f"for {target}: {str(e)}"
+            )
+            raise RuntimeError(
+                f"Failed to load transactions into YNAB: {str(e)}"
+            ) from None
+
+        ynab_response = response.json()
+        duplicates.extend(ynab_response["data"].get("duplicate_import_ids", []))
+        new_txns.extend(ynab_response["data"]["transactions"])
 
-    ynab_response = response.json()
-    duplicates = ynab_response["data"].get("duplicate_import_ids", [])
     if duplicates:
         dup_count = len(duplicates)
         dup_str = f"Skipped {dup_count} duplicates"
@@ -591,7 +571,6 @@ def load_transactions_into_ynab(
     else:
         dup_str = "No duplicates"
 
-    new_txns = ynab_response["data"]["transactions"]
     if not new_txns:
         logging.info(f"No new transactions loaded to YNAB - {dup_str}")
     else:
@@ -601,7 +580,7 @@ def load_transactions_into_ynab(
             for txn in new_txns:
                 logging.info(f"Imported: {txn['import_id']} - {txn['payee_name']} ${float(txn['amount'])/1000:.2f}")
 
-    return len(ynab_response["data"]["transactions"])
+    return len(new_txns)
 
 
 def create_adjustment_txn_ynab(
@@ -636,7 +615,7 @@ def create_adjustment_txn_ynab(
             }
         }
 
-        response = requests.post(uri, headers=ynab_headers, json=transaction)
+        response = YNAB_SESSION.post(uri, headers=ynab_headers, json=transaction)
         response.raise_for_status()
         logging.info(
             f"Created YNAB balance adjustment transaction of ${balance_difference/1000:,.2f}"
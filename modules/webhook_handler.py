@@ -8,7 +8,7 @@ from cryptography.hazmat.primitives.asymmetric import padding
 import pandas as pd
 
 from modules.account_mapper import load_existing_mapping
-from modules.config import RUN_SYNC_TO_AB, RUN_SYNC_TO_YNAB, YNAB_ENDPOINT, YNAB_HEADERS
+from modules.config import run_sync_to_ab, run_sync_to_ynab, YNAB_ENDPOINT, YNAB_HEADERS
 from modules.sync_handler import sync_to_ab, sync_to_ynab
 from modules.sync_status import generate_sync_report
 from modules.transaction_handler import (
@@ -29,15 +29,21 @@ def verify_signature(public_key: str, signature: str, request_body: bytes) -> No
     )
 
 
-def create_flask_app(actual_client, mapping_list, env_vars):
-    """Create and configure Flask application for webhook handling."""
+def create_flask_app(actual_factory, mapping_list, env_vars):
+    """Create and configure Flask application for webhook handling.
+
+    actual_factory is a context manager factory (e.g. get_actual_client) that
+    yields a connected Actual client, or None when Actual sync is disabled. Each
+    request that needs Actual opens its own connection through it.
+    """
     app = Flask(__name__)
 
     @app.route("/test", methods=["GET"])
     def test_transactions():
         """Test endpoint to validate transaction handling."""
         try:
-            result = run_transaction_tests(actual_client, mapping_list, env_vars)
+            with actual_factory() as actual_client:
+                result = run_transaction_tests(actual_client, mapping_list, env_vars)
             return jsonify(result), 200
         except Exception as e:
             logging.error(f"\n=== Test Failed ===\nError in test endpoint: {str(e)}")
@@ -71,11 +77,11 @@ def create_flask_app(actual_client, mapping_list, env_vars):
         try:
             _, _, _, mapping_list = load_existing_mapping()
 
-            if RUN_SYNC_TO_AB:
-                actual_client.download_budget()
-                actual_count = sync_to_ab(actual_client, mapping_list)
+            if run_sync_to_ab():
+                with actual_factory() as actual_client:
+                    actual_count = sync_to_ab(actual_client, mapping_list)
 
-            if RUN_SYNC_TO_YNAB:
+            if run_sync_to_ynab():
                 ynab_count = sync_to_ynab(mapping_list)
 
             return generate_sync_report(mapping_list, actual_count, ynab_count)
@@ -114,14 +120,14 @@ def create_flask_app(actual_client, mapping_list, env_vars):
         mapping_entry = mapping_list[akahu_account_id]
 
         # Process for Actual Budget if enabled
-        if RUN_SYNC_TO_AB and not mapping_entry.get("actual_do_not_map"):
-            actual_client.download_budget()
-            load_transactions_into_actual(
-                pd.DataFrame([transactions]), mapping_entry, actual_client
-            )
+        if run_sync_to_ab() and not mapping_entry.get("actual_do_not_map"):
+            with actual_factory() as actual_client:
+                load_transactions_into_actual(
+                    pd.DataFrame([transactions]), mapping_entry, actual_client
+                )
 
         # Process for YNAB if enabled
-        if RUN_SYNC_TO_YNAB and not mapping_entry.get("ynab_do_not_map"):
+        if run_sync_to_ynab() and not mapping_entry.get("ynab_do_not_map"):
             if mapping_entry.get("account_type") == "Tracking":
                 # For tracking accounts, create balance adjustment
                 akahu_balance = get_akahu_balance(